@@ -1,10 +1,18 @@
 import json
-import uuid
+import math
+import os
 import re
 from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain
 from typing import List, Dict, Tuple
 import streamlit as st
 
+try:  # optional: much faster JSON serialisation for big plans
+    import orjson
+except ImportError:
+    orjson = None
+
 # =================================================
 # 🎭 Seat Plan Adaptions (top-down insert, blocked-seat enforcement, zero-based seats)
 # =================================================
@@ -14,14 +22,23 @@ import streamlit as st
 # -------------------------------------------------
 def _natural_seat_key(seat_label: str) -> tuple:
     """Sort naturally: handles 'A1', 'A10', '1', '10', '0', etc."""
-    s = str(seat_label)
-    m = re.match(r"^([A-Za-z]+)(\d+)$", s)
-    if m:
-        row, num = m.group(1), int(m.group(2))
-        return (row.upper(), num, s)
-    m2 = re.match(r"^(\d+)$", s)
-    if m2:
-        return ("", int(m2.group(1)), s)
+    return _seat_label_key(str(seat_label))
+
+@lru_cache(maxsize=65536)
+def _seat_label_key(s: str) -> tuple:
+    """Key for one label string; cached since the same labels recur across sorts/reruns."""
+    # Hand-rolled ^([A-Za-z]+)(\d+)$ / ^(\d+)$ match (as with '$', one trailing
+    # newline is tolerated); a plain loop is cheaper than re for these labels
+    body = s[:-1] if s.endswith("\n") else s
+    end = i = len(body)
+    while i and body[i - 1].isdecimal():
+        i -= 1
+    if i < end:
+        if not i:
+            return ("", int(body), s)
+        row = body[:i]
+        if row.isascii() and row.isalpha():
+            return (row.upper(), int(body[i:]), s)
     return (s.upper(), float("inf"), s)
 
 # -------------------------------------------------
@@ -70,6 +87,68 @@ def mark_blocked_seats_uav(seatmap: Dict) -> Dict:
                     seat["status"] = "uav"
     return updated
 
+# -------------------------------------------------
+# Row-label index (section matching)
+# -------------------------------------------------
+_ROW_LETTERS_RX = re.compile(r"([A-Za-z]+)$")
+_REF_LETTERS_RX = re.compile(r"([A-Za-z]+)")  # first letter run of the reference row
+
+def _index_row_labels(seatmap: Dict) -> Dict[str, Tuple[set, set]]:
+    """
+    One pass over the plan: section_id -> (full row labels, trailing row letters),
+    both uppercased, so matching a reference row is a set lookup per section.
+    """
+    index = {}
+    for sid, sdata in seatmap.items():
+        rows = sdata.get("rows", {})
+        if not rows:
+            continue
+        full_labels, row_letters = set(), set()
+        for rdata in rows.values():
+            row_idx_raw = str(rdata.get("row_index", ""))
+            full_labels.add(row_idx_raw.upper())
+            m = _ROW_LETTERS_RX.search(row_idx_raw)
+            row_letters.add(m.group(1).upper() if m else "")
+        index[sid] = (full_labels, row_letters)
+    return index
+
+# -------------------------------------------------
+# Random id helper (row/seat ids)
+# -------------------------------------------------
+def _random_hex_ids(count: int) -> List[str]:
+    """Return `count` 6-char hex ids drawn from a single os.urandom() call."""
+    buf = os.urandom(3 * count).hex()
+    return [buf[i:i + 6] for i in range(0, 6 * count, 6)]
+
+# -------------------------------------------------
+# Seat labels for a new row (range + anomalies)
+# -------------------------------------------------
+def build_row_labels(
+    letter: str, first: int, last: int, anomalies: List[Tuple[int, str]]
+) -> List[str]:
+    """
+    Labels for one new row, e.g. ('a', 1, 3) -> A1, A2, A3.
+    Descending ranges are kept as typed; each (seat_number, label) anomaly is
+    placed right after that seat, all in a single pass.
+    """
+    prefix = str(letter).upper()
+    # Build seat sequence as typed (supports descending and 0 start)
+    if first <= last:
+        seat_numbers = range(first, last + 1)
+    else:
+        seat_numbers = range(first, last - 1, -1)
+
+    after_seat: Dict[int, List[str]] = {}
+    for ano_between, ano_label in anomalies:
+        after_seat.setdefault(ano_between, []).append(ano_label)
+
+    labels = []
+    for n in seat_numbers:
+        labels.append(prefix + str(n))
+        if n in after_seat:
+            labels.extend(after_seat[n])
+    return labels
+
 # -------------------------------------------------
 # Core helper – inserts rows keeping the correct order
 # -------------------------------------------------
@@ -81,6 +160,7 @@ def insert_rows(
     new_rows: List[Dict[str, List[str]]],
     position: str = "above",
     default_price: str = "85",
+    inplace: bool = False,
 ) -> Dict:
     """
     Insert new rows 'above' or 'below' a reference row.
@@ -91,15 +171,23 @@ def insert_rows(
              REVERSE user order for 'above' so the top-most row lands first.
 
     FIX 2: Seats whose labels contain 'pillar' or 'not for sale' are created with status='uav'.
+
+    inplace=True replaces the section's rows directly (caller owns `seatmap`).
     """
     section = seatmap[section_id]
     rows_items = list(section.get("rows", {}).items())
 
     ref_upper = str(ref_row_index).upper()
-    anchor_exists = any(
-        str(rdata.get("row_index", "")).upper() == ref_upper
-        for _, rdata in rows_items
+    # Locate the anchor once; it is also the splice point below
+    anchor_pos = next(
+        (
+            pos
+            for pos, (_, rdata) in enumerate(rows_items)
+            if str(rdata.get("row_index", "")).upper() == ref_upper
+        ),
+        None,
     )
+    anchor_exists = anchor_pos is not None
     empty_or_anchorless = (not rows_items) or (ref_upper == "0") or (not anchor_exists)
 
     if empty_or_anchorless:
@@ -113,24 +201,49 @@ def insert_rows(
         # Anchor exists: respect user order for 'below'; reverse user order for 'above'
         new_rows_sorted = list(reversed(new_rows)) if position == "above" else list(new_rows)
 
+    # Seat templates: key order is the output order; only id/number vary per seat
+    open_seat = {
+        "id": "",
+        "number": "",
+        "price": default_price,
+        "status": "av",
+        "handicap": "no",
+    }
+    blocked_seat = {**open_seat, "status": "uav"}
+
     # Build rows to insert (in the decided order)
+    total_ids = len(new_rows_sorted) + sum(len(spec["labels"]) for spec in new_rows_sorted)
+    fresh_ids = iter(_random_hex_ids(total_ids))
+    # Row/seat ids already used anywhere in the plan (plus the ones drawn below)
+    taken_row_ids, taken_seat_ids = set(), set()
+    for sdata in seatmap.values():
+        rows = sdata.get("rows")
+        if not isinstance(rows, dict):
+            continue
+        taken_row_ids.update(rows)
+        for rdata in rows.values():
+            seats = rdata.get("seats")
+            if isinstance(seats, dict):
+                taken_seat_ids.update(seats)
     ordered_pairs = []
     for spec in new_rows_sorted:
         row_label = str(spec["index"]).upper()
         seat_labels = spec["labels"]
-        row_id = f"r{uuid.uuid4().hex[:6]}"
+        row_id = f"r{next(fresh_ids)}"
+        while row_id in taken_row_ids:  # 6 hex chars can collide; never overwrite a row
+            row_id = f"r{_random_hex_ids(1)[0]}"
+        taken_row_ids.add(row_id)
         seats = {}
         for label in seat_labels:
-            seat_id = f"s{uuid.uuid4().hex[:6]}"
+            seat_id = f"s{next(fresh_ids)}"
+            while seat_id in taken_seat_ids:
+                seat_id = f"s{_random_hex_ids(1)[0]}"
+            taken_seat_ids.add(seat_id)
             # FIX 2: mark blocked seats as UAV on creation
-            blocked = _is_blocked_text(label)
-            seats[seat_id] = {
-                "id": seat_id,
-                "number": label,
-                "price": default_price,
-                "status": "uav" if blocked else "av",
-                "handicap": "no",
-            }
+            seat = (blocked_seat if _is_blocked_text(label) else open_seat).copy()
+            seat["id"] = seat_id
+            seat["number"] = label
+            seats[seat_id] = seat
         ordered_pairs.append(
             (
                 row_id,
@@ -143,39 +256,23 @@ def insert_rows(
             )
         )
 
-    updated_rows = OrderedDict()
-    inserted = False
-
-    # Insert relative to the anchor if it exists
-    for rid, rdata in rows_items:
-        if (
-            not inserted
-            and (ref_upper == "0"
-                 or str(rdata.get("row_index", "")).upper() == ref_upper)
-        ):
-            if position == "above":
-                for pid, pdata in ordered_pairs:
-                    updated_rows[pid] = pdata
-                if ref_upper != "0":
-                    updated_rows[rid] = rdata
-            else:  # below
-                if ref_upper != "0":
-                    updated_rows[rid] = rdata
-                for pid, pdata in ordered_pairs:
-                    updated_rows[pid] = pdata
-            inserted = True
-        else:
-            updated_rows[rid] = rdata
-
-    # If no anchor was matched at all, prepend/append in the already-decided order
-    if not inserted:
-        if position == "above":
-            prepend = OrderedDict((pid, pdata) for pid, pdata in ordered_pairs)
-            updated_rows = OrderedDict(list(prepend.items()) + list(updated_rows.items()))
-        else:
-            for pid, pdata in ordered_pairs:
-                updated_rows[pid] = pdata
+    # Splice the new rows in with one bulk build: head + new rows + tail
+    if rows_items and ref_upper == "0":
+        # '0' = section start: the new rows take the first row's slot
+        head, tail = [], rows_items[1:]
+    elif anchor_exists:
+        split = anchor_pos if position == "above" else anchor_pos + 1
+        head, tail = rows_items[:split], rows_items[split:]
+    elif position == "above":
+        # No anchor matched: prepend/append in the already-decided order
+        head, tail = [], rows_items
+    else:
+        head, tail = rows_items, []
+    updated_rows = OrderedDict(chain(head, ordered_pairs, tail))
 
+    if inplace:
+        section["rows"] = updated_rows
+        return seatmap
     new_seatmap = seatmap.copy()
     new_section = section.copy()
     new_section["rows"] = updated_rows
@@ -186,33 +283,71 @@ def insert_rows(
 # Relabel multiple rows + their seats
 # -------------------------------------------------
 def relabel_rows(
-    seatmap: Dict, *, section_id: str, target_row_letters: List[str], new_prefix: str
+    seatmap: Dict,
+    *,
+    section_id: str,
+    target_row_letters: List[str],
+    new_prefix: str,
+    inplace: bool = False,
 ) -> Dict:
-    if not target_row_letters:
+    """
+    Prefix the selected rows (and their seat numbers) with `new_prefix`.
+    inplace=True mutates `seatmap` directly - only for maps the caller owns
+    (e.g. a fresh parse of the upload); otherwise untouched parts are shared.
+    """
+    # An empty prefix is a no-op; seat labels are never re-cased
+    if not target_row_letters or not new_prefix:
         return seatmap
     targets_upper = {t.upper() for t in target_row_letters}
     section = seatmap.get(section_id)
     if not section or "rows" not in section:
         return seatmap
+    # No target row in this section => nothing to relabel, no copies
+    if targets_upper.isdisjoint(
+        str(rdata.get("row_index", "")).upper() for rdata in section["rows"].values()
+    ):
+        return seatmap
+
+    if inplace:
+        for rdata in section["rows"].values():
+            original_row = str(rdata.get("row_index", ""))
+            original_upper = original_row.upper()
+            if original_upper not in targets_upper:
+                continue
+            new_row_label = f"{new_prefix}{original_row}"
+            prefix_len = len(original_row)
+            for sdata in rdata["seats"].values():
+                old = str(sdata.get("number", ""))
+                # Exact-case check first (labels are usually already uppercase)
+                if old.startswith(original_row) or old.upper().startswith(original_upper):
+                    sdata["number"] = new_row_label + old[prefix_len:]
+            rdata["row_index"] = new_row_label
+        return seatmap
 
     new_seatmap = seatmap.copy()
     new_section = section.copy()
     new_rows = OrderedDict()
     for rid, rdata in section["rows"].items():
         original_row = str(rdata.get("row_index", ""))
-        if original_row.upper() in targets_upper:
+        original_upper = original_row.upper()
+        if original_upper in targets_upper:
             new_row_label = f"{new_prefix}{original_row}"
-            new_seats = {}
-            for sid, sdata in rdata["seats"].items():
+            prefix_len = len(original_row)
+            seats = rdata["seats"]
+            new_seats = None  # copied on the first seat that actually changes
+            for sid, sdata in seats.items():
                 old = str(sdata.get("number", ""))
-                if old.upper().startswith(original_row.upper()):
-                    rest = old[len(original_row):]
-                    sdata = {**sdata, "number": f"{new_row_label}{rest}"}
-                new_seats[sid] = sdata
+                # Exact-case check first (labels are usually already uppercase)
+                if old.startswith(original_row) or old.upper().startswith(original_upper):
+                    if new_seats is None:
+                        new_seats = dict(seats)
+                    new_seat = dict(sdata)
+                    new_seat["number"] = new_row_label + old[prefix_len:]
+                    new_seats[sid] = new_seat
             new_rows[rid] = {
                 **rdata,
                 "row_index": new_row_label,
-                "seats": new_seats,
+                "seats": seats if new_seats is None else new_seats,
             }
         else:
             new_rows[rid] = rdata
@@ -228,15 +363,24 @@ def update_section_meta(
     *,
     section_id: str,
     new_name: str = None,
-    new_align: str = None
+    new_align: str = None,
+    inplace: bool = False,
 ) -> Dict:
-    section = seatmap.get(section_id, {}).copy()
-    if not section:
+    current = seatmap.get(section_id)
+    if not current:
+        return seatmap
+    # Nothing to change (the usual case on save) => keep the same map, no copies
+    if (new_name is None or current.get("section_name") == new_name) and (
+        new_align is None or current.get("align") == new_align
+    ):
         return seatmap
+    section = current if inplace else current.copy()
     if new_name is not None:
         section["section_name"] = new_name
     if new_align is not None:
         section["align"] = new_align
+    if inplace:
+        return seatmap
     updated = seatmap.copy()
     updated[section_id] = section
     return updated
@@ -244,25 +388,27 @@ def update_section_meta(
 # -------------------------------------------------
 # Direction helpers (operate on selected section)
 # -------------------------------------------------
-def reverse_section_rows_order(seatmap: Dict, *, section_id: str) -> Dict:
+def reverse_section_rows_order(
+    seatmap: Dict, *, section_id: str, inplace: bool = False
+) -> Dict:
     """Reverse row order for the whole section."""
     section = seatmap.get(section_id)
     if not section or "rows" not in section:
         return seatmap
 
-    rows_items = list(section["rows"].items())  # preserves current order
-    reversed_rows = OrderedDict()
-    for rid, rdata in reversed(rows_items):
-        reversed_rows[rid] = rdata
-
+    # dict items views are reversible: no intermediate list
+    new_rows = OrderedDict(reversed(section["rows"].items()))
+    if inplace:
+        section["rows"] = new_rows
+        return seatmap
     updated = seatmap.copy()
     updated_section = section.copy()
-    updated_section["rows"] = reversed_rows
+    updated_section["rows"] = new_rows
     updated[section_id] = updated_section
     return updated
 
 def reverse_section_seat_order_selective(
-    seatmap: Dict, *, section_id: str, rows_to_reverse: List[str]
+    seatmap: Dict, *, section_id: str, rows_to_reverse: List[str], inplace: bool = False
 ) -> Dict:
     """
     Reverse seat order only for specified row labels (labels themselves unchanged).
@@ -276,23 +422,31 @@ def reverse_section_seat_order_selective(
     if not section or "rows" not in section:
         return seatmap
 
-    updated = seatmap.copy()
-    updated_section = section.copy()
     new_rows = OrderedDict()
 
     for rid, rdata in section["rows"].items():
         row_label = str(rdata.get("row_index", "")).upper()
         if row_label in targets:
-            seats_items = list(rdata.get("seats", {}).items())
-            seats_items_sorted = sorted(
-                seats_items, key=lambda kv: _natural_seat_key(kv[1].get("number", ""))
+            # One descending sort; feeding it reversed keeps equal labels in the
+            # same order that sort-then-reverse produced
+            new_seats = OrderedDict(
+                sorted(
+                    reversed(rdata.get("seats", {}).items()),
+                    key=lambda kv: _natural_seat_key(kv[1].get("number", "")),
+                    reverse=True,
+                )
             )
-            seats_items_reversed = list(reversed(seats_items_sorted))
-            new_seats = OrderedDict((sid, sdata) for sid, sdata in seats_items_reversed)
+            if inplace:
+                rdata["seats"] = new_seats
+                continue
             new_rows[rid] = {**rdata, "seats": new_seats}
-        else:
+        elif not inplace:
             new_rows[rid] = rdata
 
+    if inplace:
+        return seatmap
+    updated = seatmap.copy()
+    updated_section = section.copy()
     updated_section["rows"] = new_rows
     updated[section_id] = updated_section
     return updated
@@ -300,25 +454,29 @@ def reverse_section_seat_order_selective(
 # -------------------------------------------------
 # Delete any row that has exactly one seat (label-agnostic)
 # -------------------------------------------------
+def _is_single_seat_row(rdata: Dict) -> bool:
+    seats = rdata.get("seats", {})
+    return isinstance(seats, dict) and len(seats) == 1
+
 def delete_rows_with_exactly_one_seat(
-    seatmap: Dict, *, section_id: str
+    seatmap: Dict, *, section_id: str, inplace: bool = False
 ) -> Tuple[Dict, int]:
     section = seatmap.get(section_id)
     if not section or "rows" not in section:
         return seatmap, 0
 
+    rows = section["rows"]
+    # Keep every row except single-seat ones, built in one go
+    new_rows = OrderedDict(
+        (rid, rdata) for rid, rdata in rows.items() if not _is_single_seat_row(rdata)
+    )
+    deleted = len(rows) - len(new_rows)
+
+    if inplace:
+        section["rows"] = new_rows
+        return seatmap, deleted
     updated = seatmap.copy()
     updated_section = section.copy()
-    new_rows = OrderedDict()
-    deleted = 0
-
-    for rid, rdata in section["rows"].items():
-        seats = rdata.get("seats", {})
-        if isinstance(seats, dict) and len(seats) == 1:
-            deleted += 1
-            continue  # drop this row entirely
-        new_rows[rid] = rdata
-
     updated_section["rows"] = new_rows
     updated[section_id] = updated_section
     return updated, deleted
@@ -327,7 +485,7 @@ def delete_rows_with_exactly_one_seat(
 # Delete specific rows by row_id (manual tick list)
 # -------------------------------------------------
 def delete_specific_rows(
-    seatmap: Dict, *, section_id: str, rows_to_delete: List[str]
+    seatmap: Dict, *, section_id: str, rows_to_delete: List[str], inplace: bool = False
 ) -> Tuple[Dict, int]:
     if not rows_to_delete:
         return seatmap, 0
@@ -336,21 +494,197 @@ def delete_specific_rows(
     if not section or "rows" not in section:
         return seatmap, 0
 
+    rows = section["rows"]
+    drop = set(rows_to_delete)
+    new_rows = OrderedDict((rid, rdata) for rid, rdata in rows.items() if rid not in drop)
+    deleted = len(rows) - len(new_rows)
+
+    if inplace:
+        section["rows"] = new_rows
+        return seatmap, deleted
     updated = seatmap.copy()
     updated_section = section.copy()
-    new_rows = OrderedDict()
-    deleted = 0
-
-    for rid, rdata in section["rows"].items():
-        if rid in rows_to_delete:
-            deleted += 1
-            continue
-        new_rows[rid] = rdata
-
     updated_section["rows"] = new_rows
     updated[section_id] = updated_section
     return updated, deleted
 
+# -------------------------------------------------
+# Cached upload parsing + section matching (once per uploaded file)
+# -------------------------------------------------
+@st.cache_data(max_entries=4, ttl=24 * 60 * 60, show_spinner=False)
+def _parse_seatmap(file_bytes: bytes) -> Tuple[Dict, bool]:
+    """
+    Parse the uploaded JSON -> (seatmap, needs_stdlib_json); Streamlit hands
+    each rerun its own copy. The flag is set when any number parses to a
+    non-finite float (NaN/Infinity literals, or overflow like 1e400), which
+    orjson would silently write back out as null.
+    """
+    # stdlib on purpose: orjson turns ints wider than 64 bits into lossy floats,
+    # and this only runs once per upload anyway
+    non_finite = []
+
+    def _float(text: str) -> float:
+        value = float(text)
+        if not math.isfinite(value):
+            non_finite.append(text)
+        return value
+
+    seatmap = json.loads(file_bytes, parse_float=_float, parse_constant=_float)
+    return seatmap, bool(non_finite)
+
+_ALIGN_LABELS = {"l": "Left", "r": "Right", "def": "Centre (default)"}
+# Align selectbox lookups, built once at import rather than on every rerun
+_ALIGN_DISPLAY = list(_ALIGN_LABELS.values())
+_ALIGN_INDEX = {code: i for i, code in enumerate(_ALIGN_LABELS)}
+_ALIGN_CODE_BY_DISPLAY = {label: code for code, label in _ALIGN_LABELS.items()}
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _section_labels(file_key: str, _seatmap: Dict) -> Dict[str, str]:
+    """section_id -> selectbox label for every section with rows (once per upload)."""
+    labels = {}
+    for sid, sdata in _seatmap.items():
+        rows = sdata.get("rows", {})
+        if not rows:
+            continue
+        align_code = sdata.get("align", "def")
+        labels[sid] = (
+            f"{sdata.get('section_name','(unnamed)')} · "
+            f"rows: {len(rows)} · "
+            f"align: {_ALIGN_LABELS.get(align_code, align_code)} · "
+            f"ID: {sid}"
+        )
+    return labels
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _row_label_index(file_key: str, _seatmap: Dict) -> Dict[str, Tuple[set, set]]:
+    """_index_row_labels() built once per upload, shared by every reference row."""
+    return _index_row_labels(_seatmap)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _match_sections(file_key: str, _seatmap: Dict, ref_row_letter: str) -> Dict[str, str]:
+    """
+    label -> section_id for sections matching the reference row
+    (forgiving + fallback). Cached per upload and reference row, so reruns
+    from unrelated widgets skip the scan; `_seatmap` is not hashed.
+    """
+    matched_rows: Dict[str, str] = {}
+    ref_raw = (ref_row_letter or "").strip()
+    ref_full = ref_raw.upper()
+    base_letters_match = _REF_LETTERS_RX.search(ref_raw)
+    base_letters = base_letters_match.group(1).upper() if base_letters_match else ""
+
+    labels = _section_labels(file_key, _seatmap)
+    # '0' => every section with rows matches; no row index needed
+    if ref_full == "0":
+        return {label: sid for sid, label in labels.items()}
+
+    for sid, (full_labels, row_letters) in _row_label_index(file_key, _seatmap).items():
+        # Match rules:
+        # - letters present in ref => match by letters
+        # - otherwise (digits-only ref) => exact full match
+        if (
+            (base_letters and base_letters in row_letters)
+            or (ref_full and not base_letters and ref_full in full_labels)
+        ):
+            matched_rows[labels[sid]] = sid
+
+    # Fallback: list all sections if nothing matched
+    if not matched_rows:
+        matched_rows = {label: sid for sid, label in labels.items()}
+
+    return matched_rows
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _rows_preview(file_key: str, section_id: str, _section: Dict) -> List[str]:
+    """'A1–A20' style seat range per row, once per upload + section."""
+    rows_preview = []
+    for r in _section["rows"].values():
+        letters = r.get("row_index", "")
+        prefix_len = len(str(letters))
+        # Single pass: running min/max, no per-row list
+        lo = hi = None
+        for s in r.get("seats", {}).values():
+            number = s.get("number", "")
+            if not isinstance(number, str):
+                continue
+            tail = number[prefix_len:]
+            if tail.isdigit():
+                n = int(tail)
+                if lo is None or n < lo:
+                    lo = n
+                if hi is None or n > hi:
+                    hi = n
+        if lo is not None:
+            rows_preview.append(f"{letters}{lo}–{letters}{hi}")
+    return rows_preview
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _available_rows(file_key: str, section_id: str, _section: Dict) -> List[str]:
+    """Distinct row labels of a section, sorted case-insensitively."""
+    # sorted() calls the key once per label, so str.upper runs N times, not N log N
+    return sorted(
+        dict.fromkeys(str(r["row_index"]) for r in _section["rows"].values() if "row_index" in r),
+        key=str.upper,
+    )
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _delete_row_choices(
+    file_key: str, section_id: str, row_labels: Tuple[str, ...], _section: Dict
+) -> List[Tuple[str, str]]:
+    """(row_id, checkbox label) per row for the manual-delete list, with seat range."""
+    choices = []
+    for rid, rdata in _section["rows"].items():
+        row_label = str(rdata.get("row_index", ""))
+        row_upper = row_label.upper()
+        prefix_len = len(row_label)
+        seat_nums = []
+        for seat in rdata.get("seats", {}).values():
+            lab = str(seat.get("number", ""))
+            if lab.upper().startswith(row_upper):
+                tail = lab[prefix_len:]
+                if tail.isdigit():
+                    seat_nums.append(int(tail))
+        seat_range_txt = ""
+        if seat_nums:
+            seat_range_txt = f"{row_label}{min(seat_nums)}–{row_label}{max(seat_nums)}"
+        choices.append(
+            (rid, f"{row_label} · row_id={rid}" + (f" ({seat_range_txt})" if seat_range_txt else ""))
+        )
+    return choices
+
+# -------------------------------------------------
+# Updated plan storage + download payload
+# -------------------------------------------------
+def _dump_seatmap(seatmap: Dict, compact: bool = False, stdlib: bool = False) -> bytes:
+    """
+    Pretty-printed (2-space) or compact JSON bytes; uses orjson when installed,
+    unless `stdlib` is set (see _parse_seatmap).
+    """
+    if orjson is not None and not stdlib:
+        try:
+            return orjson.dumps(seatmap, option=0 if compact else orjson.OPT_INDENT_2)
+        except TypeError:  # orjson.JSONEncodeError: huge ints, lone surrogates...
+            pass  # the stdlib writes those just as the upload had them
+    if compact:
+        return json.dumps(seatmap, separators=(",", ":")).encode("utf-8")
+    return json.dumps(seatmap, indent=2).encode("utf-8")
+
+# Serialised payloads, one per output style (compact flag -> session key)
+_JSON_KEYS = {False: "updated_json", True: "updated_json_compact"}
+
+def _store_updated_map(updated: Dict, file_key: str, stdlib_json: bool) -> None:
+    st.session_state["updated_map"] = updated
+    st.session_state["updated_for"] = file_key
+    st.session_state["updated_stdlib_json"] = stdlib_json
+    for key in _JSON_KEYS.values():
+        st.session_state.pop(key, None)  # re-serialised on next render
+
+def _drop_stale_update(file_key: str) -> None:
+    """Forget a result (and its JSON) built from a different upload."""
+    if st.session_state.get("updated_for", file_key) != file_key:
+        for key in ("updated_map", "updated_for", "updated_stdlib_json", *_JSON_KEYS.values()):
+            st.session_state.pop(key, None)
+
 # =================================================
 # Streamlit UI
 # =================================================
@@ -376,90 +710,23 @@ do_delete_lonely_first = False  # single-seat row deletion
 rows_marked_for_manual_delete: List[str] = []  # rows you tick to delete
 
 if uploaded_file:
-    seatmap = json.load(uploaded_file)
+    _drop_stale_update(uploaded_file.file_id)
+    seatmap, stdlib_json = _parse_seatmap(uploaded_file.getvalue())
 
     # --------------------------------------------
     # Find candidate sections (forgiving + fallback)
     # --------------------------------------------
-    matched_rows: List[Tuple[str, str]] = []
-    ref_raw = (ref_row_letter or "").strip()
-    ref_full = ref_raw.upper()
-    base_letters_match = re.search(r"([A-Za-z]+)", ref_raw or "")
-    base_letters = base_letters_match.group(1).upper() if base_letters_match else ""
-
-    for sid, sdata in seatmap.items():
-        rows = sdata.get("rows", {})
-        if not rows:
-            continue
-        for rdata in rows.values():
-            row_idx_raw = str(rdata.get("row_index", ""))
-            row_idx_full = row_idx_raw.upper()
-            row_idx_letters_match = re.search(r"([A-Za-z]+)$", row_idx_raw)
-            row_idx_letters = row_idx_letters_match.group(1).upper() if row_idx_letters_match else ""
-
-            # Match rules:
-            # - '0' => always match section
-            # - letters present in ref => match by letters
-            # - otherwise (digits-only ref) => exact full match
-            if (
-                ref_full == "0"
-                or (base_letters and row_idx_letters == base_letters)
-                or (ref_full and not base_letters and row_idx_full == ref_full)
-            ):
-                align_code = sdata.get("align", "def")
-                align_friendly = {
-                    "l": "Left",
-                    "r": "Right",
-                    "def": "Centre (default)"
-                }.get(align_code, align_code)
-                label = (
-                    f"{sdata.get('section_name','(unnamed)')} · "
-                    f"rows: {len(rows)} · "
-                    f"align: {align_friendly} · "
-                    f"ID: {sid}"
-                )
-                matched_rows.append((label, sid))
-                break
-
-    # Fallback: list all sections if nothing matched
-    if not matched_rows:
-        for sid, sdata in seatmap.items():
-            rows = sdata.get("rows", {})
-            if not rows:
-                continue
-            align_code = sdata.get("align", "def")
-            align_friendly = {
-                "l": "Left",
-                "r": "Right",
-                "def": "Centre (default)"
-            }.get(align_code, align_code)
-            label = (
-                f"{sdata.get('section_name','(unnamed)')} · "
-                f"rows: {len(rows)} · "
-                f"align: {align_friendly} · "
-                f"ID: {sid}"
-            )
-            matched_rows.append((label, sid))
+    matched_rows = _match_sections(uploaded_file.file_id, seatmap, ref_row_letter)
 
     if not matched_rows:
         st.warning("No section matches that row/seat.")
     else:
-        display_labels = [lbl for lbl, _ in matched_rows]
+        display_labels = list(matched_rows)
         label_choice = st.selectbox("Select section:", display_labels)
-        section_id = dict(matched_rows)[label_choice]
+        section_id = matched_rows[label_choice]
 
         # Preview rows in this section
-        rows_preview = []
-        for r in seatmap[section_id]["rows"].values():
-            letters = r.get("row_index", "")
-            nums = [
-                int(s["number"][len(str(letters)):])
-                for s in r.get("seats", {}).values()
-                if isinstance(s.get("number", ""), str)
-                and s["number"][len(str(letters)) :].isdigit()
-            ]
-            if nums:
-                rows_preview.append(f"{letters}{min(nums)}–{letters}{max(nums)}")
+        rows_preview = _rows_preview(uploaded_file.file_id, section_id, seatmap[section_id])
         st.markdown("**Rows in this section:** " + (", ".join(rows_preview) or "(none)"))
 
         # Section settings (name + align)
@@ -467,36 +734,24 @@ if uploaded_file:
         current_name = seatmap[section_id].get("section_name", "")
         current_align = seatmap[section_id].get("align", "def")
 
-        align_labels = {"l": "Left", "r": "Right", "def": "Centre (default)"}
-        align_options = list(align_labels.keys())
-        align_display = [align_labels[a] for a in align_options]
-
         col_sn, col_al = st.columns([3, 1])
         with col_sn:
             edited_name = st.text_input("Section name", value=current_name)
         with col_al:
-            selected_index = (
-                align_options.index(current_align)
-                if current_align in align_options
-                else 2
-            )
+            selected_index = _ALIGN_INDEX.get(current_align, 2)
             display_choice = st.selectbox(
                 "Align",
-                align_display,
+                _ALIGN_DISPLAY,
                 index=selected_index,
                 help="Where this section sits in the auditorium view."
             )
-            edited_align = align_options[align_display.index(display_choice)]
+            edited_align = _ALIGN_CODE_BY_DISPLAY[display_choice]
 
         st.caption("Tip: Left / Right / Centre = seating alignment within the plan.")
 
         # Optional: Relabel
         with st.expander("Optional: Relabel existing rows (e.g. add '(RV) ' prefix)"):
-            available_rows = []
-            for r in seatmap[section_id]["rows"].values():
-                if "row_index" in r:
-                    available_rows.append(str(r["row_index"]))
-            available_rows = sorted(dict.fromkeys(available_rows), key=lambda x: x.upper())
+            available_rows = _available_rows(uploaded_file.file_id, section_id, seatmap[section_id])
 
             col_a, col_b = st.columns([2, 3])
             with col_a:
@@ -523,8 +778,9 @@ if uploaded_file:
                         section_id=section_id,
                         target_row_letters=selected_rows,
                         new_prefix=new_prefix,
+                        inplace=True,  # fresh per-rerun copy of the upload
                     )
-                    st.session_state["updated_map"] = seatmap
+                    _store_updated_map(seatmap, uploaded_file.file_id, stdlib_json)
                     st.success(f"Relabelled {len(selected_rows)} row(s).")
                 except Exception as e:
                     st.error(str(e))
@@ -596,26 +852,18 @@ if uploaded_file:
 
             rows_marked_for_manual_delete = []
             if "rows" in seatmap[section_id]:
-                all_rows_items = list(seatmap[section_id]["rows"].items())
+                section_rows = seatmap[section_id]["rows"]
+                # Row labels are part of the key: a relabel earlier in this run changes them
+                row_labels_key = tuple(str(r.get("row_index", "")) for r in section_rows.values())
+                delete_choices = _delete_row_choices(
+                    uploaded_file.file_id, section_id, row_labels_key, seatmap[section_id]
+                )
                 del_cols = st.columns(2)
 
-                for i, (rid, rdata) in enumerate(all_rows_items):
-                    row_label = str(rdata.get("row_index", ""))
-                    seats_dict = rdata.get("seats", {})
-                    seat_nums = []
-                    for seat in seats_dict.values():
-                        lab = str(seat.get("number", ""))
-                        if lab.upper().startswith(row_label.upper()):
-                            tail = lab[len(row_label):]
-                            if tail.isdigit():
-                                seat_nums.append(int(tail))
-                    seat_range_txt = ""
-                    if seat_nums:
-                        seat_range_txt = f"{row_label}{min(seat_nums)}–{row_label}{max(seat_nums)}"
-
+                for i, (rid, choice_label) in enumerate(delete_choices):
                     with del_cols[i % 2]:
                         del_chk = st.checkbox(
-                            f"{row_label} · row_id={rid}" + (f" ({seat_range_txt})" if seat_range_txt else ""),
+                            choice_label,
                             value=False,
                             key=f"delrow_{rid}",
                             help="Tick to remove this entire row from the plan."
@@ -631,7 +879,8 @@ if uploaded_file:
 
         num_rows = st.number_input("How many new rows to add?", 1, 10, 1)
 
-        new_rows = []
+        # Only the raw inputs are collected per rerun; labels are built on save
+        row_specs: List[Tuple[str, int, int, List[Tuple[int, str]]]] = []
         for i in range(int(num_rows)):
             st.markdown(f"### Row #{i+1}")
             col1, col2, col3 = st.columns([1, 1, 2])
@@ -643,14 +892,6 @@ if uploaded_file:
                 last = st.number_input("Last seat", min_value=0, max_value=999, value=1, key=f"last_{i}")
 
             if letter:
-                # Build seat sequence as typed (supports descending and 0 start)
-                if first <= last:
-                    seat_numbers = list(range(first, last + 1))
-                else:
-                    seat_numbers = list(range(first, last - 1, -1))
-
-                base_labels = [f"{str(letter).upper()}{n}" for n in seat_numbers]
-
                 num_anomalies = st.number_input(
                     f"How many anomalies in Row #{i+1}?", 0, 5, 0, key=f"num_ano_{i}"
                 )
@@ -679,13 +920,7 @@ if uploaded_file:
                     if ano_label:
                         anomalies.append((ano_between, ano_label))
 
-                for ano_between, ano_label in sorted(anomalies, key=lambda x: x[0], reverse=True):
-                    # Insert after the chosen number
-                    if ano_between in seat_numbers:
-                        insertion_index = seat_numbers.index(ano_between) + 1
-                        base_labels.insert(insertion_index, ano_label)
-
-                new_rows.append({"index": str(letter).upper(), "labels": base_labels})
+                row_specs.append((str(letter).upper(), first, last, anomalies))
 
         # -----------------------------
         # APPLY: update plan
@@ -693,9 +928,18 @@ if uploaded_file:
         if uploaded_file and section_id:
             if st.button("💾 Update Plan"):
                 try:
+                    # `seatmap` is this rerun's own copy of the upload, so the
+                    # steps below edit it in place instead of re-copying it
                     current = seatmap
 
                     # 1) If adding rows, insert them first
+                    new_rows = [
+                        {
+                            "index": row_label,
+                            "labels": build_row_labels(row_label, first, last, anomalies),
+                        }
+                        for row_label, first, last, anomalies in row_specs
+                    ]
                     default_price = seatmap[section_id].get("price", seatmap[section_id].get("def_price", "85"))
                     if new_rows:
                         current = insert_rows(
@@ -705,6 +949,7 @@ if uploaded_file:
                             new_rows=new_rows,
                             position=position,
                             default_price=default_price,
+                            inplace=True,
                         )
 
                     # 2) Apply meta changes (name + align)
@@ -713,19 +958,25 @@ if uploaded_file:
                         section_id=section_id,
                         new_name=edited_name,
                         new_align=edited_align,
+                        inplace=True,
                     )
 
                     # 3) Apply direction fixes (affects newly added rows too)
                     if do_reverse_rows:
-                        current = reverse_section_rows_order(current, section_id=section_id)
+                        current = reverse_section_rows_order(current, section_id=section_id, inplace=True)
                     if do_reverse_seats_master:
                         current = reverse_section_seat_order_selective(
-                            current, section_id=section_id, rows_to_reverse=rows_selected or []
+                            current,
+                            section_id=section_id,
+                            rows_to_reverse=rows_selected or [],
+                            inplace=True,
                         )
 
                     # 4a) Cleanup: delete any single-seat rows
                     if do_delete_lonely_first:
-                        current, deleted_auto = delete_rows_with_exactly_one_seat(current, section_id=section_id)
+                        current, deleted_auto = delete_rows_with_exactly_one_seat(
+                            current, section_id=section_id, inplace=True
+                        )
                         if deleted_auto:
                             st.info(f"Cleanup removed {deleted_auto} single-seat row(s).")
 
@@ -734,7 +985,8 @@ if uploaded_file:
                         current, deleted_manual = delete_specific_rows(
                             current,
                             section_id=section_id,
-                            rows_to_delete=rows_marked_for_manual_delete
+                            rows_to_delete=rows_marked_for_manual_delete,
+                            inplace=True,
                         )
                         if deleted_manual:
                             st.info(f"Removed {deleted_manual} row(s) you ticked for deletion.")
@@ -742,7 +994,7 @@ if uploaded_file:
                     # FINAL ENFORCEMENT: keep pillar / not-for-sale seats unavailable
                     current = mark_blocked_seats_uav(current)
 
-                    st.session_state["updated_map"] = current
+                    _store_updated_map(current, uploaded_file.file_id, stdlib_json)
                     st.success("Plan updated – download below 👇")
                 except Exception as e:
                     st.error(str(e))
@@ -751,5 +1003,22 @@ if uploaded_file:
 # Download the updated JSON
 # -----------------------------
 if "updated_map" in st.session_state:
-    js = json.dumps(st.session_state["updated_map"], indent=2)
-    st.download_button("📥 Download updated JSON", js, "seatmap_updated.json")
+    compact = st.checkbox(
+        "Compact JSON (no indentation)",
+        value=False,
+        help="Smaller file and faster to build; same data, just not human-friendly.",
+    )
+    # Serialised once per update (and style), not on every rerun
+    json_key = _JSON_KEYS[compact]
+    if json_key not in st.session_state:
+        st.session_state[json_key] = _dump_seatmap(
+            st.session_state["updated_map"],
+            compact=compact,
+            stdlib=st.session_state.get("updated_stdlib_json", False),
+        )
+    st.download_button(
+        "📥 Download updated JSON",
+        st.session_state[json_key],
+        "seatmap_updated.json",
+        mime="application/json",
+    )